@@ -1,10 +1,14 @@
 import os
+import queue
 import sqlite3
 import json
-from contextlib import closing
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing, contextmanager
 from datetime import datetime, date, time, timedelta
-from typing import List, Optional
-import hashlib  
+from typing import List, Optional, Tuple
+import hashlib
+import hmac
 
 import pandas as pd
 import plotly.express as px
@@ -15,18 +19,154 @@ import streamlit.components.v1 as components
 DB_PATH = "school_van_complaints.db"
 UPLOAD_DIR = "uploads"
 
+# Widget options shared by the principal, organization and chairman pages
+BUS_RANGE = tuple(range(1, 71))
+BUS_FILTER_OPTIONS = ("All",) + BUS_RANGE
+STATUSES = ("Open", "In Progress", "Resolved")
+STATUS_OPTIONS = ("All",) + STATUSES
+PROBLEM_TYPES = ("Fight", "Driver Misconduct", "Delay", "Breakdown", "Other")
+
 
 # -----------------------------
 # Database helpers
 # -----------------------------
 
 
-def get_connection():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-20000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+def _configure(conn: sqlite3.Connection, readonly: bool = False):
+    """
+    Applies the per-connection PRAGMAs. WAL lets readers proceed while a write
+    is in flight; journal_mode persists in the file header so re-issuing it is
+    a no-op. Read-only handles skip it, since switching modes is a write.
+    """
+    for pragma in PRAGMAS[1:] if readonly else PRAGMAS:
+        conn.execute(pragma)
+
+
+def get_connection(readonly: bool = False):
+    """
+    Opens a configured connection. With readonly=True the file is opened via
+    a mode=ro URI, so SQLite never takes write locks or records a COMMIT.
+    """
+    if readonly:
+        conn = sqlite3.connect(
+            f"file:{DB_PATH}?mode=ro", uri=True, check_same_thread=False
+        )
+    else:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False)
     conn.row_factory = sqlite3.Row
+    _configure(conn, readonly)
     return conn
 
 
+class ReadPool:
+    """
+    Fixed-size pool of read-only connections. Slots start empty and are
+    opened on first checkout, so idle processes hold no file handles.
+    """
+
+    def __init__(self, size: int):
+        self._idle: queue.Queue = queue.Queue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(None)
+
+    def acquire(self) -> sqlite3.Connection:
+        conn = self._idle.get()
+        if conn is not None:
+            return conn
+        try:
+            return get_connection(readonly=True)
+        except BaseException:
+            # Hand the empty slot back so a failed open doesn't shrink the pool
+            self._idle.put(None)
+            raise
+
+    def release(self, conn: sqlite3.Connection):
+        self._idle.put(conn)
+
+
+class WriterLock:
+    """
+    Guards the single long-lived writer connection. SQLite allows one writer
+    at a time anyway, so serializing here avoids SQLITE_BUSY retries.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def __enter__(self) -> sqlite3.Connection:
+        self._lock.acquire()
+        try:
+            if self._conn is None:
+                self._conn = get_connection()
+        except BaseException:
+            self._lock.release()
+            raise
+        return self._conn
+
+    def __exit__(self, *exc):
+        self._lock.release()
+
+    def discard(self):
+        """Drops a writer left in an unknown state; the next entry reopens it."""
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except sqlite3.Error:
+                pass
+            self._conn = None
+
+
+# Streamlit re-executes this script on every rerun; cache_resource keeps the
+# pools alive for the lifetime of the server process.
+@st.cache_resource
+def get_read_pool() -> ReadPool:
+    return ReadPool(os.cpu_count() or 4)
+
+
+@st.cache_resource
+def get_writer_lock() -> WriterLock:
+    return WriterLock()
+
+
+@contextmanager
+def get_read_conn():
+    pool = get_read_pool()
+    conn = pool.acquire()
+    try:
+        yield conn
+    finally:
+        pool.release(conn)
+
+
+@contextmanager
+def get_write_conn():
+    writer = get_writer_lock()
+    with writer as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            # Also covers a failed COMMIT, which would otherwise leave the
+            # shared writer stuck inside the transaction
+            try:
+                conn.rollback()
+            except sqlite3.Error:
+                writer.discard()
+            raise
+
+
 def init_db():
     os.makedirs(UPLOAD_DIR, exist_ok=True)
     with closing(get_connection()) as conn, conn:
@@ -59,31 +199,136 @@ def init_db():
             """
         )
 
-        # Seed default users if not present
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS photos (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                complaint_id INTEGER NOT NULL
+                    REFERENCES complaints(id) ON DELETE CASCADE,
+                path TEXT NOT NULL
+            )
+            """
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_photos_complaint ON photos(complaint_id)"
+        )
+        # photo_paths used to be a JSON array; it is now newline-separated
+        conn.execute(
+            """
+            UPDATE complaints
+            SET photo_paths = (
+                SELECT group_concat(value, char(10))
+                FROM json_each(complaints.photo_paths)
+            )
+            WHERE photo_paths LIKE '[%'
+            """
+        )
+        # Backfill photos for complaints saved before the table existed
+        unlinked = conn.execute(
+            """
+            SELECT id, photo_paths
+            FROM complaints c
+            WHERE COALESCE(photo_paths, '') != ''
+              AND NOT EXISTS (SELECT 1 FROM photos p WHERE p.complaint_id = c.id)
+            """
+        ).fetchall()
+        conn.executemany(
+            "INSERT INTO photos (complaint_id, path) VALUES (?, ?)",
+            [(r["id"], path) for r in unlinked for path in r["photo_paths"].split("\n")],
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_c_status_dt ON complaints(status, complaint_datetime DESC)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_c_bus_dt ON complaints(bus_number, complaint_datetime DESC)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_c_dt ON complaints(complaint_datetime)"
+        )
+
+        # Per-user scrypt salt; rows without one still hold legacy SHA-256 hashes
+        user_columns = {r["name"] for r in conn.execute("PRAGMA table_info(users)")}
+        if "salt" not in user_columns:
+            conn.execute("ALTER TABLE users ADD COLUMN salt BLOB")
+
+        # Seed default users if not present. Older databases hold these
+        # accounts with plaintext passwords; the upsert hashes them in place.
         users = [
             ("principal", "principal123", "principal"),
             ("org", "org123", "org"),
             ("chairman", "chairman123", "chairman"),
         ]
-        for username, password, role in users:
-            conn.execute(
-                """
-                INSERT OR IGNORE INTO users (username, password, role)
-                VALUES (?, ?, ?)
-                """,
-                (username, password, role),
+        placeholders = ", ".join("?" * len(users))
+        hashed = {
+            r["username"]
+            for r in conn.execute(
+                f"SELECT username FROM users WHERE salt IS NOT NULL AND username IN ({placeholders})",
+                [username for username, _, _ in users],
             )
+        }
+        seeds = []
+        for username, password, role in users:
+            if username in hashed:
+                continue
+            salt = os.urandom(16)
+            seeds.append((username, hash_password(password, salt), role, salt, password))
+        conn.executemany(
+            """
+            INSERT INTO users (username, password, role, salt)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(username) DO UPDATE
+            SET password = excluded.password, salt = excluded.salt
+            WHERE users.salt IS NULL AND users.password = ?
+            """,
+            seeds,
+        )
+
+
+_DUMMY_SALT = bytes(16)
+
+
+def hash_password(password: str, salt: bytes) -> str:
+    return hashlib.scrypt(
+        password.encode("utf-8"), salt=salt, n=2**14, r=8, p=1
+    ).hex()
+
+
+@st.cache_resource
+def _ensure_schema() -> bool:
+    """Runs init_db once per server process instead of on every rerun."""
+    init_db()
+    return True
 
 
 def fetch_user(username: str, password: str) -> Optional[sqlite3.Row]:
-    """FIXED - Now hashes password for login"""
-    hashed_password = hashlib.sha256(password.encode('utf-8')).hexdigest()
-    with closing(get_connection()) as conn, conn:
-        cur = conn.execute(
-            "SELECT * FROM users WHERE username = ? AND password = ?",
-            (username.strip(), hashed_password),
+    """
+    Returns the user row when the password matches. Accounts created before
+    scrypt was introduced are verified against their SHA-256 hash once and
+    then re-hashed with a fresh salt.
+    """
+    with get_read_conn() as conn:
+        user = conn.execute(
+            "SELECT * FROM users WHERE username = ?", (username.strip(),)
+        ).fetchone()
+    if user is None:
+        # Pay for a hash anyway so response time doesn't reveal valid usernames
+        hash_password(password, _DUMMY_SALT)
+        return None
+
+    if user["salt"] is not None:
+        candidate = hash_password(password, user["salt"])
+        return user if hmac.compare_digest(candidate, user["password"]) else None
+
+    legacy = hashlib.sha256(password.encode("utf-8")).hexdigest()
+    if not hmac.compare_digest(legacy, user["password"]):
+        return None
+    salt = os.urandom(16)
+    with get_write_conn() as conn:
+        conn.execute(
+            "UPDATE users SET password = ?, salt = ? WHERE id = ?",
+            (hash_password(password, salt), salt, user["id"]),
         )
-        return cur.fetchone()
+    return user
 
 
 def insert_complaint(
@@ -93,9 +338,8 @@ def insert_complaint(
     details: str,
     photo_paths: List[str],
 ):
-    now = datetime.utcnow().isoformat()
-    with closing(get_connection()) as conn, conn:
-        conn.execute(
+    with get_write_conn() as conn:
+        cur = conn.execute(
             """
             INSERT INTO complaints (
                 bus_number,
@@ -107,18 +351,28 @@ def insert_complaint(
                 created_at,
                 updated_at
             )
-            VALUES (?, ?, ?, ?, ?, 'Open', ?, ?)
+            VALUES (
+                ?, ?, ?, ?, ?, 'Open',
+                strftime('%Y-%m-%dT%H:%M:%f', 'now'),
+                strftime('%Y-%m-%dT%H:%M:%f', 'now')
+            )
             """,
             (
                 bus_number,
                 complaint_dt.isoformat(),
                 problem_type,
                 details,
-                json.dumps(photo_paths),
-                now,
-                now,
+                "\n".join(photo_paths),
             ),
         )
+        # Same transaction as the complaint: one commit for all photo rows
+        conn.executemany(
+            "INSERT INTO photos (complaint_id, path) VALUES (?, ?)",
+            [(cur.lastrowid, path) for path in photo_paths],
+        )
+    fetch_complaints.clear()
+    fetch_complaints_with_csv.clear()
+    fetch_metrics.clear()
 
 
 def update_complaint_status(
@@ -126,44 +380,72 @@ def update_complaint_status(
     status: str,
     response: Optional[str],
 ):
-    now = datetime.utcnow().isoformat()
-    resolved_at = now if status == "Resolved" else None
-    with closing(get_connection()) as conn, conn:
+    with get_write_conn() as conn:
         conn.execute(
             """
             UPDATE complaints
             SET status = ?,
                 org_response = ?,
-                updated_at = ?,
-                resolved_at = CASE WHEN ? IS NULL THEN resolved_at ELSE ? END
+                updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now'),
+                resolved_at = CASE
+                    WHEN ? = 'Resolved' THEN strftime('%Y-%m-%dT%H:%M:%f', 'now')
+                    ELSE resolved_at
+                END
             WHERE id = ?
             """,
-            (status, response, now, resolved_at, resolved_at, complaint_id),
+            (status, response, status, complaint_id),
         )
+    fetch_complaints.clear()
+    fetch_complaints_with_csv.clear()
+    fetch_metrics.clear()
 
 
 def set_chairman_reaction(complaint_id: int, reaction: str):
-    now = datetime.utcnow().isoformat()
-    with closing(get_connection()) as conn, conn:
+    with get_write_conn() as conn:
         conn.execute(
             """
             UPDATE complaints
             SET chairman_reaction = ?,
-                updated_at = ?
+                updated_at = strftime('%Y-%m-%dT%H:%M:%f', 'now')
             WHERE id = ?
             """,
-            (reaction, now, complaint_id),
+            (reaction, complaint_id),
         )
+    fetch_complaints.clear()
+    fetch_complaints_with_csv.clear()
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def fetch_complaints(
     bus: Optional[int] = None,
     problem: Optional[str] = None,
     status: Optional[str] = None,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-):
-    query = "SELECT * FROM complaints WHERE 1=1"
+    limit: Optional[int] = None,
+) -> pd.DataFrame:
+    """
+    Cached per filter combination; the write helpers clear the cache so new
+    complaints and status changes show up on the next rerun. Timestamp
+    columns come back parsed; nullable text columns come back as "".
+    """
+    query = """
+        SELECT
+            id,
+            bus_number,
+            complaint_datetime,
+            problem_type,
+            details,
+            COALESCE(photo_paths, '') AS photo_paths,
+            status,
+            COALESCE(org_response, '') AS org_response,
+            created_at,
+            updated_at,
+            resolved_at,
+            COALESCE(chairman_reaction, '') AS chairman_reaction
+        FROM complaints
+        WHERE 1=1
+    """
     params: List = []
 
     if bus is not None:
@@ -175,49 +457,93 @@ def fetch_complaints(
     if status and status != "All":
         query += " AND status = ?"
         params.append(status)
+    # Compare the raw ISO text so the complaint_datetime indexes stay usable
     if start_date:
-        query += " AND date(complaint_datetime) >= ?"
-        params.append(start_date.isoformat())
+        query += " AND complaint_datetime >= ?"
+        params.append(start_date.isoformat() + "T00:00:00")
     if end_date:
-        query += " AND date(complaint_datetime) <= ?"
-        params.append(end_date.isoformat())
+        query += " AND complaint_datetime < ?"
+        params.append((end_date + timedelta(days=1)).isoformat() + "T00:00:00")
 
     query += " ORDER BY complaint_datetime DESC"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+
+    iso = {"format": "ISO8601"}
+    with get_read_conn() as conn:
+        return pd.read_sql_query(
+            query,
+            conn,
+            params=params,
+            parse_dates={
+                "complaint_datetime": iso,
+                "created_at": iso,
+                "resolved_at": iso,
+            },
+        )
 
-    with closing(get_connection()) as conn, conn:
-        cur = conn.execute(query, params)
-        rows = cur.fetchall()
-        return rows
 
+# Column -> display label for the complaint tables
+COLUMN_LABELS = {
+    "id": "ID",
+    "bus_number": "Bus",
+    "complaint_datetime": "Date/Time",
+    "problem_type": "Problem",
+    "status": "Status",
+    "details": "Details",
+    "org_response": "Org Response",
+    "photo_paths": "Photos",
+    "chairman_reaction": "Reaction",
+}
+
+# Columns shown in the principal and organization complaint lists
+SUMMARY_COLUMNS = ["ID", "Bus", "Date/Time", "Problem", "Status", "Org Response", "Photos"]
+
+# Columns in the chairman's detailed table and CSV export
+DETAIL_COLUMNS = [
+    "ID",
+    "Bus",
+    "Date/Time",
+    "Status",
+    "Problem",
+    "Details",
+    "Org Response",
+    "Photos",
+    "Reaction",
+]
 
-def complaints_to_df(rows: List[sqlite3.Row]) -> pd.DataFrame:
-    if not rows:
-        return pd.DataFrame(
-            columns=[
-                "ID",
-                "Bus",
-                "Date/Time",
-                "Problem",
-                "Status",
-                "Org Response",
-                "Photos",
-            ]
-        )
-    data = []
-    for r in rows:
-        photos = json.loads(r["photo_paths"] or "[]")
-        data.append(
-            {
-                "ID": r["id"],
-                "Bus": r["bus_number"],
-                "Date/Time": r["complaint_datetime"],
-                "Problem": r["problem_type"],
-                "Status": r["status"],
-                "Org Response": r["org_response"] or "",
-                "Photos": len(photos),
-            }
+
+def label_complaints(df: pd.DataFrame, columns: List[str]) -> pd.DataFrame:
+    """
+    Renames a fetch_complaints frame to display labels and keeps `columns`.
+    Photo paths are newline-separated, so the count is newlines + 1 for any
+    non-empty value.
+    """
+    paths = df["photo_paths"]
+    df = df.assign(photo_paths=paths.str.count("\n") + paths.astype(bool).astype(int))
+    return df.rename(columns=COLUMN_LABELS)[columns]
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_metrics():
+    """
+    Returns (total, open, resolved_today, avg_resolution_hours) in a single
+    aggregate scan. Timestamps are stored in UTC, so "today" is UTC as well.
+    Cached so the chairman's filter changes don't re-run the aggregate.
+    """
+    with get_read_conn() as conn:
+        cur = conn.execute(
+            """
+            SELECT
+                COUNT(*),
+                COALESCE(SUM(status = 'Open'), 0),
+                COALESCE(SUM(date(resolved_at) = date('now')), 0),
+                AVG((julianday(resolved_at) - julianday(created_at)) * 24)
+            FROM complaints
+            """
         )
-    return pd.DataFrame(data)
+        return tuple(cur.fetchone())
 
 
 # -----------------------------
@@ -225,10 +551,11 @@ def complaints_to_df(rows: List[sqlite3.Row]) -> pd.DataFrame:
 # -----------------------------
 
 
-def inject_pwa_and_theme():
+@st.cache_resource
+def _build_pwa_html() -> str:
     """
-    Injects manifest + client-side service worker registration for basic PWA support
-    and sets some global CSS for a polished, mobile-first look.
+    Builds the manifest + service worker script and global CSS. The result is
+    constant, so it is rendered once per process rather than on every rerun.
     """
     manifest = {
         "name": "School Van Complaint Tracker",
@@ -354,7 +681,15 @@ def inject_pwa_and_theme():
     </style>
     """
 
-    components.html(html, height=0)
+    return html
+
+
+def inject_pwa_and_theme():
+    """
+    Injects manifest + client-side service worker registration for basic PWA support
+    and sets some global CSS for a polished, mobile-first look.
+    """
+    components.html(_build_pwa_html(), height=0)
 
 
 # -----------------------------
@@ -396,14 +731,14 @@ def login():
         
         if st.button("✅ Create Account", key="signup_btn"):
             if new_username and new_password:
-                hashed_pw = hashlib.sha256(new_password.encode('utf-8')).hexdigest()
+                salt = os.urandom(16)
+                hashed_pw = hash_password(new_password, salt)
                 try:
-                    with closing(get_connection()) as conn, conn:
+                    with get_write_conn() as conn:
                         conn.execute(
-                            "INSERT INTO users (username, password, role) VALUES (?, ?, ?)",
-                            (new_username.strip(), hashed_pw, role)
+                            "INSERT INTO users (username, password, role, salt) VALUES (?, ?, ?, ?)",
+                            (new_username.strip(), hashed_pw, role, salt)
                         )
-                        conn.commit()
                     st.success(f"✅ {new_username} created! Now Sign In above 👆")
                     st.rerun()
                 except Exception as e:
@@ -411,14 +746,6 @@ def login():
             else:
                 st.warning("👆 Fill all fields")
 
-# CHANGE 3: Update init_db() default users (around line 60) - just change passwords
-users = [
-    ("admin_principal", "admin123", "principal"),  # CHANGE PASSWORDS HERE
-    ("admin_org", "admin456", "org"),
-    ("admin_chairman", "admin789", "chairman"),
-]
-
-
 
 def logout():
     if "user" in st.session_state:
@@ -431,6 +758,13 @@ def logout():
 # -----------------------------
 
 
+def _write_upload(upload) -> str:
+    path, data = upload
+    with open(path, "wb") as f:
+        f.write(data)
+    return path
+
+
 def principal_page():
     st.markdown(
         """
@@ -447,22 +781,13 @@ def principal_page():
     with st.form("principal_form", clear_on_submit=True):
         col1, col2 = st.columns(2)
         with col1:
-            bus_number = st.selectbox("Bus Number", list(range(1, 71)))
+            bus_number = st.selectbox("Bus Number", BUS_RANGE)
         with col2:
             dt_default = datetime.now()
             complaint_date = st.date_input("Date", dt_default.date())
             complaint_time = st.time_input("Time", dt_default.time())
 
-        problem_type = st.selectbox(
-            "Problem Type",
-            [
-                "Fight",
-                "Driver Misconduct",
-                "Delay",
-                "Breakdown",
-                "Other",
-            ],
-        )
+        problem_type = st.selectbox("Problem Type", PROBLEM_TYPES)
 
         details = st.text_area(
             "Detailed Description",
@@ -486,14 +811,13 @@ def principal_page():
                 # Combine date and time
                 complaint_dt = datetime.combine(complaint_date, complaint_time)
 
-                # Save photos to disk
-                saved_paths: List[str] = []
+                # Save photos to disk, overlapping the writes
+                uploads = []
                 for file in photos or []:
                     safe_name = f"{datetime.utcnow().strftime('%Y%m%d%H%M%S%f')}_{file.name}"
-                    file_path = os.path.join(UPLOAD_DIR, safe_name)
-                    with open(file_path, "wb") as f:
-                        f.write(file.getbuffer())
-                    saved_paths.append(file_path)
+                    uploads.append((os.path.join(UPLOAD_DIR, safe_name), file.getbuffer()))
+                with ThreadPoolExecutor(max_workers=4) as pool:
+                    saved_paths: List[str] = list(pool.map(_write_upload, uploads))
 
                 insert_complaint(
                     bus_number=bus_number,
@@ -505,9 +829,8 @@ def principal_page():
                 st.success("Complaint submitted successfully.")
 
     st.markdown("### Recent Complaints")
-    rows = fetch_complaints()
-    df = complaints_to_df(rows)
-    st.dataframe(df.head(10), use_container_width=True)
+    df = label_complaints(fetch_complaints(limit=10), SUMMARY_COLUMNS)
+    st.dataframe(df, use_container_width=True)
 
 
 # -----------------------------
@@ -531,19 +854,20 @@ def org_page():
     with st.expander("Filters", expanded=True):
         c1, c2, c3 = st.columns(3)
         with c1:
-            bus = st.selectbox("Bus", ["All"] + list(range(1, 71)))
+            bus = st.selectbox("Bus", BUS_FILTER_OPTIONS)
         with c2:
             problem = st.text_input("Problem contains")
         with c3:
-            status = st.selectbox("Status", ["All", "Open", "In Progress", "Resolved"])
+            status = st.selectbox("Status", STATUS_OPTIONS)
 
     bus_filter = None if bus == "All" else int(bus)
-    rows = fetch_complaints(
+    complaints = fetch_complaints(
         bus=bus_filter,
         problem=problem or None,
         status=status if status != "All" else None,
     )
-    df = complaints_to_df(rows)
+    rows_by_id = complaints.set_index("id", drop=False)
+    df = label_complaints(complaints, SUMMARY_COLUMNS)
 
     st.markdown("#### Complaints")
     st.dataframe(df, use_container_width=True)
@@ -551,30 +875,24 @@ def org_page():
     if not df.empty:
         st.markdown("#### Update Status / Add Response")
         selected_id = st.selectbox("Select Complaint ID", df["ID"].tolist())
-        selected_row = next(r for r in rows if r["id"] == selected_id)
+        selected_row = rows_by_id.loc[selected_id]
 
         col1, col2 = st.columns(2)
         with col1:
             new_status = st.selectbox(
                 "Status",
-                ["Open", "In Progress", "Resolved"],
-                index=["Open", "In Progress", "Resolved"].index(
-                    selected_row["status"]
-                ),
+                STATUSES,
+                index=STATUSES.index(selected_row["status"]),
             )
         with col2:
             st.write(
                 f"**Bus {selected_row['bus_number']} – {selected_row['problem_type']}**"
             )
-            st.caption(
-                datetime.fromisoformat(selected_row["complaint_datetime"]).strftime(
-                    "%d %b %Y %H:%M"
-                )
-            )
+            st.caption(selected_row["complaint_datetime"].strftime("%d %b %Y %H:%M"))
 
         response = st.text_area(
             "Organization Response / Action Taken",
-            value=selected_row["org_response"] or "",
+            value=selected_row["org_response"],
             height=140,
         )
 
@@ -583,19 +901,17 @@ def org_page():
             st.success("Complaint updated.")
             st.rerun()
 
-        photos = json.loads(selected_row["photo_paths"] or "[]")
+        photos = (
+            selected_row["photo_paths"].split("\n") if selected_row["photo_paths"] else []
+        )
         if photos:
             st.markdown("##### Photos")
             pcols = st.columns(min(3, len(photos)))
             for idx, path in enumerate(photos):
-                try:
-                    with open(path, "rb") as f:
-                        img_bytes = f.read()
+                if os.path.exists(path):
                     pcols[idx % len(pcols)].image(
-                        img_bytes, use_column_width=True, caption=os.path.basename(path)
+                        path, use_column_width=True, caption=os.path.basename(path)
                     )
-                except FileNotFoundError:
-                    pass
 
 
 # -----------------------------
@@ -603,24 +919,51 @@ def org_page():
 # -----------------------------
 
 
-def compute_resolution_metrics(rows: List[sqlite3.Row]):
-    total = len(rows)
-    open_count = sum(1 for r in rows if r["status"] == "Open")
-
-    today_str = date.today().isoformat()
-    resolved_today = 0
-    durations: List[float] = []
+@st.cache_data(max_entries=32, show_spinner=False)
+def build_status_pie(status_counts: tuple):
+    """
+    Builds the status breakdown pie from pre-aggregated (status, count)
+    pairs; the tuple doubles as the cache key.
+    """
+    df_counts = pd.DataFrame(status_counts, columns=["Status", "Count"])
+    pie = px.pie(
+        df_counts,
+        names="Status",
+        values="Count",
+        title="Status Breakdown",
+        color="Status",
+        color_discrete_map={
+            "Open": "#f97316",
+            "In Progress": "#eab308",
+            "Resolved": "#22c55e",
+        },
+    )
+    pie.update_traces(textposition="inside", textinfo="percent+label")
+    pie.update_layout(
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font_color="#e5e7eb",
+    )
+    return pie
 
-    for r in rows:
-        if r["resolved_at"]:
-            resolved_dt = datetime.fromisoformat(r["resolved_at"])
-            created_dt = datetime.fromisoformat(r["created_at"])
-            durations.append((resolved_dt - created_dt).total_seconds() / 3600.0)
-            if resolved_dt.date().isoformat() == today_str:
-                resolved_today += 1
 
-    avg_hours = sum(durations) / len(durations) if durations else None
-    return total, open_count, resolved_today, avg_hours
+@st.cache_data(ttl=30, max_entries=32, show_spinner=False)
+def fetch_complaints_with_csv(
+    bus: Optional[int],
+    status: Optional[str],
+    start_date: Optional[date],
+    end_date: Optional[date],
+) -> Tuple[pd.DataFrame, bytes]:
+    """
+    Returns the chairman's filtered complaints together with their CSV
+    export. Both come from the same rows, so the download always matches
+    the table on screen.
+    """
+    complaints = fetch_complaints(
+        bus=bus, status=status, start_date=start_date, end_date=end_date
+    )
+    csv_data = label_complaints(complaints, DETAIL_COLUMNS).to_csv(index=False)
+    return complaints, csv_data.encode("utf-8")
 
 
 def chairman_page():
@@ -636,8 +979,7 @@ def chairman_page():
         unsafe_allow_html=True,
     )
 
-    rows = fetch_complaints()
-    total, open_count, resolved_today, avg_hours = compute_resolution_metrics(rows)
+    total, open_count, resolved_today, avg_hours = fetch_metrics()
 
     # Metric cards with gradient styling
     c1, c2, c3, c4 = st.columns(4)
@@ -688,7 +1030,7 @@ def chairman_page():
     with st.expander("Analytics Filters", expanded=True):
         c1, c2, c3 = st.columns(3)
         with c1:
-            bus = st.selectbox("Bus", ["All"] + list(range(1, 71)), key="chair_bus")
+            bus = st.selectbox("Bus", BUS_FILTER_OPTIONS, key="chair_bus")
         with c2:
             start = st.date_input(
                 "From Date",
@@ -704,92 +1046,29 @@ def chairman_page():
 
         c4, _ = st.columns([1, 2])
         with c4:
-            status = st.selectbox(
-                "Status", ["All", "Open", "In Progress", "Resolved"], key="chair_status"
-            )
+            status = st.selectbox("Status", STATUS_OPTIONS, key="chair_status")
 
     bus_filter = None if bus == "All" else int(bus)
-    filtered_rows = fetch_complaints(
-        bus=bus_filter,
-        status=status if status != "All" else None,
-        start_date=start,
-        end_date=end,
+    filtered, csv_data = fetch_complaints_with_csv(
+        bus_filter, status if status != "All" else None, start, end
     )
+    rows_by_id = filtered.set_index("id", drop=False)
 
     # Pie chart – status breakdown
-    if filtered_rows:
-        df_chart = pd.DataFrame(
-            [
-                {
-                    "Status": r["status"],
-                    "Bus": f"Bus {r['bus_number']}",
-                }
-                for r in filtered_rows
-            ]
-        )
-        pie = px.pie(
-            df_chart,
-            names="Status",
-            title="Status Breakdown",
-            color="Status",
-            color_discrete_map={
-                "Open": "#f97316",
-                "In Progress": "#eab308",
-                "Resolved": "#22c55e",
-            },
-        )
-        pie.update_traces(textposition="inside", textinfo="percent+label")
-        pie.update_layout(
-            paper_bgcolor="rgba(0,0,0,0)",
-            plot_bgcolor="rgba(0,0,0,0)",
-            font_color="#e5e7eb",
-        )
-        st.plotly_chart(pie, use_container_width=True)
+    if not filtered.empty:
+        status_counts = tuple(sorted(filtered["status"].value_counts().items()))
+        st.plotly_chart(build_status_pie(status_counts), use_container_width=True)
     else:
         st.info("No complaints for the selected filters.")
 
     # Detailed table
     st.markdown("### Detailed Complaints")
 
-    def detailed_df(rows_: List[sqlite3.Row]) -> pd.DataFrame:
-        if not rows_:
-            return pd.DataFrame(
-                columns=[
-                    "ID",
-                    "Bus",
-                    "Date/Time",
-                    "Status",
-                    "Problem",
-                    "Details",
-                    "Org Response",
-                    "Photos",
-                    "Reaction",
-                ]
-            )
-        data = []
-        for r in rows_:
-            photos = json.loads(r["photo_paths"] or "[]")
-            data.append(
-                {
-                    "ID": r["id"],
-                    "Bus": r["bus_number"],
-                    "Date/Time": r["complaint_datetime"],
-                    "Status": r["status"],
-                    "Problem": r["problem_type"],
-                    "Details": r["details"],
-                    "Org Response": r["org_response"] or "",
-                    "Photos": len(photos),
-                    "Reaction": r["chairman_reaction"] or "",
-                }
-            )
-        return pd.DataFrame(data)
-
-    df_full = detailed_df(filtered_rows)
+    df_full = label_complaints(filtered, DETAIL_COLUMNS)
 
     # Export options
     export_cols = st.columns(2)
     with export_cols[0]:
-        csv_data = df_full.to_csv(index=False).encode("utf-8")
         st.download_button(
             "Download CSV",
             csv_data,
@@ -834,8 +1113,8 @@ def chairman_page():
     if not df_full.empty:
         st.markdown("#### Inspect & React")
         selected_id = st.selectbox("Select Complaint ID", df_full["ID"].tolist())
-        row = next(r for r in filtered_rows if r["id"] == selected_id)
-        photos = json.loads(row["photo_paths"] or "[]")
+        row = rows_by_id.loc[selected_id]
+        photos = row["photo_paths"].split("\n") if row["photo_paths"] else []
 
         with st.expander(
             f"Bus {row['bus_number']} – {row['problem_type']} (Status: {row['status']})",
@@ -851,16 +1130,12 @@ def chairman_page():
                 st.markdown("**Photos**")
                 pcols = st.columns(min(3, len(photos)))
                 for idx, path in enumerate(photos):
-                    try:
-                        with open(path, "rb") as f:
-                            img_bytes = f.read()
+                    if os.path.exists(path):
                         pcols[idx % len(pcols)].image(
-                            img_bytes,
+                            path,
                             use_column_width=True,
                             caption=os.path.basename(path),
                         )
-                    except FileNotFoundError:
-                        pass
 
             st.write("---")
             st.write("**Chairman Reaction**")
@@ -892,7 +1167,7 @@ def main():
         initial_sidebar_state="expanded",
     )
     inject_pwa_and_theme()
-    init_db()
+    _ensure_schema()
 
     st.sidebar.markdown("## School Van Complaint Tracker")
     st.sidebar.caption("Production-ready demo • Streamlit PWA + SQLite")